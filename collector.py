@@ -0,0 +1,161 @@
+"""
+Shared base class for simple PANOS collectors
+
+Modules:
+    3rd Party: logging
+    Internal: xml_api
+
+Classes:
+
+    PanosQuery
+        Run one operational command and store the raw response
+
+Functions
+
+    None
+
+Exceptions:
+
+    None
+
+Misc Variables:
+
+    None
+
+Author:
+    Luke Robertson - June 2023
+"""
+
+import logging
+
+import xml_api
+
+
+logger = logging.getLogger(__name__)
+
+
+class PanosQuery:
+    """
+    Run one operational command against a PANOS device
+
+    The single-table collectors (routing, VLANs) all behave the
+        same way: connect, run one command on entry, store the raw
+        response, and log any error on exit
+    Subclasses set the command and storage attribute as
+        class-level constants
+
+    Attributes
+    ----------
+    host : str
+        IP address or FQDN of the device to connect to
+    token : str
+        API token to use for authentication
+
+    Methods
+    -------
+    __init__(host, token)
+        Class constructor
+    __enter__()
+        Called when the 'with' statement is used
+    __exit__(exc_type, exc_value, traceback)
+        Called when the 'with' statement is finished
+    """
+
+    # The command to run, and the attribute the raw response
+    #   is stored in; set by each subclass
+    XPATH = None
+    ARG = ''
+    ATTR = None
+
+    def __init__(self, host, token):
+        """
+        Class constructor
+
+        Parameters
+        ----------
+        host : str
+            IP address or FQDN of the device to connect to
+        token : str
+            API token to use for authentication
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        # Authentication information
+        self.host = host
+        self.token = token
+
+        # Device information
+        setattr(self, self.ATTR, None)
+
+    def __enter__(self):
+        """
+        Called when the 'with' statement is used
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        self
+            The instantiated object
+        """
+
+        # Connect to PANOS
+        conn = xml_api.get_session(self.host, self.token)
+
+        # Collect the raw response
+        setattr(
+            self,
+            self.ATTR,
+            conn.op(xpath=self.XPATH, arg=self.ARG)
+        )
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Called when the 'with' statement is finished
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        self
+            None
+        """
+
+        # Log errors that were raised
+        #   The traceback is only formatted if logging emits the record
+        if exc_type:
+            logger.error(
+                "Exception of type %s occurred: %s",
+                exc_type.__name__,
+                exc_value,
+                exc_info=(exc_type, exc_value, traceback)
+            )
+
+        # Never suppress the exception
+        return False
+
+
+# Handle running as a script
+if __name__ == '__main__':
+    print('This module should not be run as a script')
@@ -2,7 +2,7 @@
 Get information about PANOS devices
 
 Modules:
-    3rd Party: traceback
+    3rd Party: logging, concurrent.futures
     Internal: xml_api
 
 Classes:
@@ -26,20 +26,43 @@ Misc Variables:
         RADIUS server default retries
     RADIUS_ACCPORT : int
         RADIUS server default accounting port
+    _INFO_XPATH : str
+        XPath for the system info command
+    _LICENSE_XPATH : str
+        XPath for the license info command
+    _SHARED_XPATH : str
+        XPath for the shared config
+    _SYSTEM_XPATH : str
+        XPath for the system config
 
 Author:
     Luke Robertson - June 2023
 """
 
-import traceback as tb
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 import xml_api
 
 
+logger = logging.getLogger(__name__)
+
+# Extracts all the device facts in one call
+_FACTS_GET = itemgetter('hostname', 'serial', 'uptime', 'model', 'sw-version')
+
+
 RADIUS_TIMEOUT = 5
 RADIUS_RETRIES = 3
 RADIUS_ACCPORT = 1813
 
+# XPaths for the raw data fetched from the device
+#   Built once at import, rather than per call
+_INFO_XPATH = '/show/system/info'
+_LICENSE_XPATH = '/request/license/info'
+_SHARED_XPATH = '/config/shared'
+_SYSTEM_XPATH = '/config/devices/entry/deviceconfig/system'
+
 
 class Device:
     """
@@ -62,6 +85,8 @@ class Device:
         Called when the 'with' statement is used
     __exit__(exc_type, exc_value, traceback)
         Called when the 'with' statement is finished
+    prefetch_all()
+        Fetch everything the accessors need in one concurrent batch
     facts()
         Get device facts, including hostname, serial, uptime, model, version
     license()
@@ -78,7 +103,20 @@ class Device:
         Get SNMP server information, including server, community, trap
     """
 
-    def __init__(self, host, token):
+    # Fixed attribute layout
+    #   Shrinks instances and speeds up attribute access
+    __slots__ = (
+        'host',
+        'token',
+        'api',
+        'raw_info',
+        'raw_license',
+        'system',
+        '_shared_config',
+        '_cache',
+    )
+
+    def __init__(self, host, token, api=None):
         """
         Class constructor
 
@@ -88,6 +126,10 @@ class Device:
             IP address or FQDN of the device to connect to
         token : str
             API token to use for authentication
+        api : xml_api.XmlApi, optional
+            An existing API connection to reuse
+            Pass the same object to several collectors to share
+                one session with the device
 
         Raises
         ------
@@ -102,19 +144,29 @@ class Device:
         self.host = host
         self.token = token
 
-        # Device information
+        # Reuse the caller's API connection if one was given
+        self.api = api if api else xml_api.XmlApi(host, token)
+
+        # Device information, fetched on first use
         self.raw_info = None
         self.raw_license = None
-        self.raw_radius = None
-        self.raw_syslog = None
-        self.raw_ntp = None
-        self.raw_dns = None
-        self.raw_snmp = None
+        self.system = None
+        self._shared_config = None
+
+        # Parsed results, cached on first access
+        #   The raw_* responses are fetched once and never mutated,
+        #   so the cache is valid for the life of the object
+        self._cache = {}
 
     def __enter__(self):
         """
         Called when the 'with' statement is used
 
+        No API calls are made here; each raw response is fetched
+            when an accessor first needs it
+        Callers that want the full snapshot up front can call
+            prefetch_all()
+
         Parameters
         ----------
         None
@@ -129,39 +181,103 @@ class Device:
             The instantiated object
         """
 
-        SHARED = '/config/shared'
-        DEVICES = '/config/devices/entry'
+        return self
 
-        # Connect to PANOS
-        conn = xml_api.XmlApi(self.host, self.token)
+    def _api_calls(self):
+        """
+        Build the list of API calls that populate the raw data
 
-        # Get device facts
-        self.raw_info = conn.op(xpath='/show/system/info')
+        Each entry pairs the attribute to store the response on
+            with a callable that makes the request
 
-        # Get license information
-        self.raw_license = conn.op(xpath='/request/license/info')
+        The radius and syslog profiles both live under the shared
+            config, and the SNMP settings live under the system config
+        Fetching the two parent nodes and slicing client-side
+            keeps the number of round trips down
 
-        # Get RADIUS server information
-        self.raw_radius = conn.get_config(
-            xpath=f'{SHARED}/server-profile/radius'
-        )
+        Parameters
+        ----------
+        None
 
-        # Get syslog server information
-        self.raw_syslog = conn.get_config(
-            xpath=f'{SHARED}/log-settings/syslog'
-        )
+        Raises
+        ------
+        None
 
-        # Get NTP and DNS server information
-        self.system = conn.get_config(
-            xpath=f'{DEVICES}/deviceconfig/system'
-        )
+        Returns
+        -------
+        list
+            A list of (attribute, callable) pairs
+        """
 
-        # Get SNMP server information
-        self.raw_snmp = conn.get_config(
-            xpath=f'{DEVICES}/deviceconfig/system/snmp-setting'
-        )
+        conn = self.api
 
-        return self
+        return [
+            ('raw_info', lambda: conn.op(xpath=_INFO_XPATH)),
+            ('raw_license', lambda: conn.op(xpath=_LICENSE_XPATH)),
+            ('_shared_config', lambda: conn.get_config(xpath=_SHARED_XPATH)),
+            ('system', lambda: conn.get_config(xpath=_SYSTEM_XPATH)),
+        ]
+
+    def _ensure(self, attr):
+        """
+        Fetch one raw response, if it has not been fetched yet
+
+        Parameters
+        ----------
+        attr : str
+            The attribute to populate (eg, 'raw_info')
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        if getattr(self, attr) is None:
+            for name, call in self._api_calls():
+                if name == attr:
+                    setattr(self, attr, call())
+                    break
+
+    def prefetch_all(self):
+        """
+        Fetch everything the accessors need in one concurrent batch
+
+        The API calls are independent of each other
+        Dispatch them concurrently, so the total time is
+            the slowest call, not the sum of all of them
+
+        Parameters
+        ----------
+        None
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        # Only fetch what is still missing
+        calls = [
+            (attr, call)
+            for attr, call in self._api_calls()
+            if getattr(self, attr) is None
+        ]
+
+        if not calls:
+            return
+
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            for attr, result in executor.map(
+                lambda call: (call[0], call[1]()), calls
+            ):
+                setattr(self, attr, result)
 
     def __exit__(self, exc_type, exc_value, traceback):
         """
@@ -181,14 +297,92 @@ class Device:
             None
         """
 
-        # handle errors that were raised
+        # Log errors that were raised
+        #   The traceback is only formatted if logging emits the record
         if exc_type:
-            print(
-                f"Exception of type {exc_type.__name__} occurred: {exc_value}"
+            logger.error(
+                "Exception of type %s occurred: %s",
+                exc_type.__name__,
+                exc_value,
+                exc_info=(exc_type, exc_value, traceback)
             )
-            if traceback:
-                print("Traceback:")
-                print(tb.format_tb(traceback))
+
+    @property
+    def raw_radius(self):
+        """
+        A view of the RADIUS server profiles
+        Sliced from the shared config, in the same shape as a
+            dedicated get_config call would return
+
+        Returns
+        -------
+        dict
+            The RADIUS config, wrapped as an API response
+        """
+
+        self._ensure('_shared_config')
+
+        shared = self._shared_config['response']['result']['shared']
+        return {
+            'response': {
+                'result': {
+                    'radius': shared['server-profile']['radius']
+                }
+            }
+        }
+
+    @property
+    def raw_syslog(self):
+        """
+        A view of the syslog server profiles
+        Sliced from the shared config, in the same shape as a
+            dedicated get_config call would return
+
+        Returns
+        -------
+        dict
+            The syslog config, wrapped as an API response
+        """
+
+        self._ensure('_shared_config')
+
+        shared = self._shared_config['response']['result']['shared']
+        return {
+            'response': {
+                'result': {
+                    'syslog': shared['log-settings']['syslog']
+                }
+            }
+        }
+
+    @property
+    def raw_snmp(self):
+        """
+        A view of the SNMP settings
+        Sliced from the system config, in the same shape as a
+            dedicated get_config call would return
+
+        Returns
+        -------
+        dict
+            The SNMP config, wrapped as an API response
+            The result is None if there are no SNMP settings
+                (eg, a standby device)
+        """
+
+        self._ensure('system')
+
+        system = self.system['response']['result']['system']
+        if 'snmp-setting' in system:
+            result = {'snmp-setting': system['snmp-setting']}
+        else:
+            result = None
+
+        return {
+            'response': {
+                'result': result
+            }
+        }
 
     def facts(self):
         """
@@ -208,16 +402,23 @@ class Device:
             Dictionary containing device facts
         """
 
+        # Return the cached result if this has been parsed before
+        if 'facts' in self._cache:
+            return self._cache['facts']
+
+        self._ensure('raw_info')
         dev_facts = self.raw_info['response']['result']['system']
+        hostname, serial, uptime, model, version = _FACTS_GET(dev_facts)
 
         info = {
-            "hostname": dev_facts['hostname'],
-            "serial": dev_facts['serial'],
-            "uptime": dev_facts['uptime'],
-            "model": dev_facts['model'],
-            "version": dev_facts['sw-version']
+            "hostname": hostname,
+            "serial": serial,
+            "uptime": uptime,
+            "model": model,
+            "version": version
         }
 
+        self._cache['facts'] = info
         return info
 
     def license(self):
@@ -238,10 +439,15 @@ class Device:
             A list of licence dictionaries
         """
 
+        # Return the cached result if this has been parsed before
+        if 'license' in self._cache:
+            return self._cache['license']
+
         lic = {
             'licenses': []
         }
 
+        self._ensure('raw_license')
         dev_lic = self.raw_license['response']['result']['licenses']['entry']
         for license in dev_lic:
             entry = {}
@@ -250,6 +456,7 @@ class Device:
             entry['expiry'] = license['expires']
             lic['licenses'].append(entry)
 
+        self._cache['license'] = lic
         return lic
 
     def radius(self):
@@ -271,46 +478,32 @@ class Device:
             List of radius dictionaries
         """
 
-        rad = {
-            "radius-servers": []
-        }
-
-        dev_radius = self.raw_radius['response']['result']['radius']['entry']
-        if type(dev_radius) is not list:
-            dev_radius = [dev_radius]
-
-        for server_list in dev_radius:
-            server = server_list['server']['entry']
-            if type(server) is not list:
-                server = [server]
-
-            for server_entry in server:
-                entry = {}
-                entry['server'] = server_entry['ip-address']
-                entry['port'] = server_entry['port']
-
-                if 'accounting-port' in server_entry:
-                    entry['acc_port'] = server_entry['accounting-port']
-                else:
-                    entry['acc_port'] = RADIUS_ACCPORT
+        # Return the cached result if this has been parsed before
+        if 'radius' in self._cache:
+            return self._cache['radius']
 
-                if 'auth-timeout' in server_entry:
-                    entry['timeout'] = server_entry['auth-timeout']
-                else:
-                    entry['timeout'] = RADIUS_TIMEOUT
-
-                if 'auth-retries' in server_entry:
-                    entry['retry'] = server_entry['auth-retries']
-                else:
-                    entry['retry'] = RADIUS_RETRIES
-
-                if 'source-ip' in server_entry:
-                    entry['source'] = server_entry['source-ip']
-                else:
-                    entry['source'] = ''
+        dev_radius = xml_api.as_list(
+            self.raw_radius['response']['result']['radius']['entry']
+        )
 
-                rad['radius-servers'].append(entry)
+        # Build each entry as a single dict literal,
+        #   rather than key-by-key with appends
+        rad = {
+            "radius-servers": [
+                {
+                    'server': server['ip-address'],
+                    'port': server['port'],
+                    'acc_port': server.get('accounting-port', RADIUS_ACCPORT),
+                    'timeout': server.get('auth-timeout', RADIUS_TIMEOUT),
+                    'retry': server.get('auth-retries', RADIUS_RETRIES),
+                    'source': server.get('source-ip', ''),
+                }
+                for server_list in dev_radius
+                for server in xml_api.as_list(server_list['server']['entry'])
+            ]
+        }
 
+        self._cache['radius'] = rad
         return rad
 
     def syslog(self):
@@ -332,41 +525,31 @@ class Device:
             List of syslog dictionaries
         """
 
-        sys = {
-            "syslog-servers": []
-        }
+        # Return the cached result if this has been parsed before
+        if 'syslog' in self._cache:
+            return self._cache['syslog']
 
-        dev_syslog = self.raw_syslog['response']['result']['syslog']['entry']
-        if type(dev_syslog) is not list:
-            dev_syslog = [dev_syslog]
-
-        for server_list in dev_syslog:
-            server = server_list['server']['entry']
-            if type(server) is not list:
-                server = [server]
-
-            for server_entry in server:
-                entry = {}
-                entry['server'] = server_entry['server']
-                entry['facilities'] = server_entry['facility']
-
-                if 'level' in server_entry:
-                    entry['level'] = server_entry['level']
-                else:
-                    entry['level'] = ''
-
-                if 'source' in server_entry:
-                    entry['source'] = server_entry['source']
-                else:
-                    entry['source'] = ''
-
-                if 'prefix' in server_entry:
-                    entry['prefix'] = server_entry['prefix']
-                else:
-                    entry['prefix'] = ''
+        dev_syslog = xml_api.as_list(
+            self.raw_syslog['response']['result']['syslog']['entry']
+        )
 
-                sys['syslog-servers'].append(entry)
+        # Build each entry as a single dict literal,
+        #   rather than key-by-key with appends
+        sys = {
+            "syslog-servers": [
+                {
+                    'server': server['server'],
+                    'facilities': server['facility'],
+                    'level': server.get('level', ''),
+                    'source': server.get('source', ''),
+                    'prefix': server.get('prefix', ''),
+                }
+                for server_list in dev_syslog
+                for server in xml_api.as_list(server_list['server']['entry'])
+            ]
+        }
 
+        self._cache['syslog'] = sys
         return sys
 
     def ntp(self):
@@ -387,14 +570,19 @@ class Device:
             List of NTP dictionaries
         """
 
+        # Return the cached result if this has been parsed before
+        if 'ntp' in self._cache:
+            return self._cache['ntp']
+
         ntp_list = {
             "ntp-servers": []
         }
 
-        if 'ntp-servers' in self.system['response']['result']['system']:
-            ntp_servers = (
-                self.system['response']['result']['system']['ntp-servers']
-            )
+        self._ensure('system')
+        system = self.system['response']['result']['system']
+
+        if 'ntp-servers' in system:
+            ntp_servers = system['ntp-servers']
 
             # Get the primary NTP server
             if 'primary-ntp-server' in ntp_servers:
@@ -429,6 +617,7 @@ class Device:
                 }
             )
 
+        self._cache['ntp'] = ntp_list
         return ntp_list
 
     def dns(self):
@@ -449,35 +638,42 @@ class Device:
             Dictionary containing DNS information
         """
 
+        # Return the cached result if this has been parsed before
+        if 'dns' in self._cache:
+            return self._cache['dns']
+
         dns_list = {
             'dns-servers': {
                 'servers': []
             }
         }
+        self._ensure('system')
         system = self.system['response']['result']['system']
+        servers = system['dns-setting']['servers']
 
         # Get the domain name
         if 'domain' in system:
             dns_list['dns-servers']['domain'] = system['domain']
 
         # Get the primary DNS server
-        if 'primary' in system['dns-setting']['servers']:
+        if 'primary' in servers:
             dns_list['dns-servers']['servers'].append(
                 {
-                    'server': system['dns-setting']['servers']['primary'],
+                    'server': servers['primary'],
                     'source': ''
                 }
             )
 
         # Get the secondary DNS server
-        if 'secondary' in system['dns-setting']['servers']:
+        if 'secondary' in servers:
             dns_list['dns-servers']['servers'].append(
                 {
-                    'server': system['dns-setting']['servers']['secondary'],
+                    'server': servers['secondary'],
                     'source': ''
                 }
             )
 
+        self._cache['dns'] = dns_list
         return dns_list
 
     def snmp(self):
@@ -499,6 +695,10 @@ class Device:
             Dictionary containing SNMP information
         """
 
+        # Return the cached result if this has been parsed before
+        if 'snmp' in self._cache:
+            return self._cache['snmp']
+
         snmp_list = {
             "snmp": {
                 "communities": [
@@ -506,50 +706,39 @@ class Device:
             }
         }
 
+        # Alias the inner dict, so each field write is one lookup
+        snmp = snmp_list['snmp']
+
         # Check that there is a result (there may not be for a standby device)
         if self.raw_snmp['response']['result'] is not None:
             snmp_servers = self.raw_snmp['response']['result']['snmp-setting']
         else:
-            snmp_servers = []
-
-        if 'name' in snmp_servers:
-            snmp_list['snmp']['name'] = snmp_servers['name']
-        else:
-            snmp_list['snmp']['name'] = ''
+            snmp_servers = {}
 
-        if 'contact' in snmp_servers:
-            snmp_list['snmp']['contact'] = snmp_servers['contact']
-        else:
-            snmp_list['snmp']['contact'] = ''
-
-        if 'description' in snmp_servers:
-            snmp_list['snmp']['description'] = snmp_servers['description']
-        else:
-            snmp_list['snmp']['description'] = ''
+        snmp['name'] = snmp_servers.get('name', '')
+        snmp['contact'] = snmp_servers.get('contact', '')
+        snmp['description'] = snmp_servers.get('description', '')
 
         if snmp_servers:
-            if 'v2c' in snmp_servers['access-setting']['version']:
+            version = snmp_servers['access-setting']['version']
+            if 'v2c' in version:
                 entry = {}
-                entry['community'] = (
-                    snmp_servers
-                    ['access-setting']
-                    ['version']
-                    ['v2c']
-                    ['snmp-community-string']
-                )
+                entry['community'] = version['v2c']['snmp-community-string']
                 entry['access'] = ''
                 entry['clients'] = ['']
-                snmp_list['snmp']['communities'].append(entry)
+                snmp['communities'].append(entry)
             else:
-                snmp_list['snmp']['communities']['community'] = ''
-                snmp_list['snmp']['communities']['access'] = ''
-                snmp_list['snmp']['communities']['clients'] = ['']
+                snmp['communities'] = {}
+                snmp['communities']['community'] = ''
+                snmp['communities']['access'] = ''
+                snmp['communities']['clients'] = ['']
         else:
-            snmp_list['snmp']['communities'] = {}
-            snmp_list['snmp']['communities']['community'] = ''
-            snmp_list['snmp']['communities']['access'] = ''
-            snmp_list['snmp']['communities']['clients'] = ['']
+            snmp['communities'] = {}
+            snmp['communities']['community'] = ''
+            snmp['communities']['access'] = ''
+            snmp['communities']['clients'] = ['']
 
+        self._cache['snmp'] = snmp_list
         return snmp_list
 
 
@@ -2,7 +2,7 @@
 Get hardware information about PANOS devices
 
 Modules:
-    3rd Party: traceback
+    3rd Party: logging, concurrent.futures
     Internal: xml_api
 
 Classes:
@@ -20,17 +20,44 @@ Exceptions:
 
 Misc Variables:
 
-    None
+    _CPU_AVG_RE : re.Pattern
+        Extracts the 1/5/15 minute load averages from 'top' output
+    _CPU_STATS_RE : re.Pattern
+        Extracts the used and idle CPU percentages from 'top' output
+    _MEM_RE : re.Pattern
+        Extracts the total and used memory from 'top' output
 
 Author:
     Luke Robertson - June 2023
 """
 
-import traceback as tb
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 import xml_api
 
 
+logger = logging.getLogger(__name__)
+
+# Extract the fields of a thermal or fan entry in one call
+_TEMP_GET = itemgetter('DegreesC', 'description')
+_FAN_GET = itemgetter('description', 'alarm', 'RPMs')
+
+
+# The one and only Hardware implementation lives in this module
+__all__ = ['Hardware']
+
+
+# The device returns raw 'top' output for CPU and memory usage
+# Parse each line with one precompiled pattern,
+#   rather than chains of str.replace calls
+_CPU_AVG_RE = re.compile(r'load average:\s*([\d.]+),\s*([\d.]+),\s*([\d.]+)')
+_CPU_STATS_RE = re.compile(r'%Cpu\(s\):\s*([\d.]+)\s*us.*?([\d.]+)\s*id')
+_MEM_RE = re.compile(r'KiB Mem\s*:\s*(\d+)\s*total.*?(\d+)\s*used')
+
+
 class Hardware:
     """
     Connect to a PANOS device and collect hardware information
@@ -64,7 +91,18 @@ class Hardware:
         Get fan information
     """
 
-    def __init__(self, host, token):
+    # Fixed attribute layout
+    #   Shrinks instances and speeds up attribute access
+    __slots__ = (
+        'host',
+        'token',
+        'api',
+        'raw_resources',
+        'raw_disk',
+        'raw_env',
+    )
+
+    def __init__(self, host, token, api=None):
         """
         Class constructor
 
@@ -74,6 +112,10 @@ class Hardware:
             IP address or FQDN of the device to connect to
         token : str
             API token to use for authentication
+        api : xml_api.XmlApi, optional
+            An existing API connection to reuse
+            Pass the same object to several collectors to share
+                one session with the device
 
         Raises
         ------
@@ -88,6 +130,9 @@ class Hardware:
         self.host = host
         self.token = token
 
+        # Reuse the caller's API connection if one was given
+        self.api = api if api else xml_api.XmlApi(host, token)
+
         # Device information
         self.raw_resources = None
         self.raw_disk = None
@@ -112,16 +157,22 @@ class Hardware:
         """
 
         # Connect to PANOS
-        conn = xml_api.XmlApi(self.host, self.token)
-
-        # Get CPU and memory information
-        self.raw_resources = conn.op(xpath='/show/system/resources')
-
-        # Get disk information
-        self.raw_disk = conn.op(xpath='/show/system/disk-space')
-
-        # Get environmental information
-        self.raw_env = conn.op(xpath='/show/system/environmentals')
+        conn = self.api
+
+        # The API calls are independent of each other
+        # Dispatch them concurrently, so the total time is
+        #   the slowest call, not the sum of all of them
+        calls = [
+            ('raw_resources', lambda: conn.op(xpath='/show/system/resources')),
+            ('raw_disk', lambda: conn.op(xpath='/show/system/disk-space')),
+            ('raw_env', lambda: conn.op(xpath='/show/system/environmentals')),
+        ]
+
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            for attr, result in executor.map(
+                lambda call: (call[0], call[1]()), calls
+            ):
+                setattr(self, attr, result)
 
         return self
 
@@ -143,14 +194,15 @@ class Hardware:
             None
         """
 
-        # handle errors that were raised
+        # Log errors that were raised
+        #   The traceback is only formatted if logging emits the record
         if exc_type:
-            print(
-                f"Exception of type {exc_type.__name__} occurred: {exc_value}"
+            logger.error(
+                "Exception of type %s occurred: %s",
+                exc_type.__name__,
+                exc_value,
+                exc_info=(exc_type, exc_value, traceback)
             )
-            if traceback:
-                print("Traceback:")
-                print(tb.format_tb(traceback))
 
     def cpu(self):
         """
@@ -173,28 +225,17 @@ class Hardware:
 
         top = self.raw_resources['response']['result']
         top = top.split('\n')
-        cpu_avg = top[0].split(',')
-        cpu_stats = top[2].split(',')
+        cpu_avg = _CPU_AVG_RE.search(top[0])
+        cpu_stats = _CPU_STATS_RE.search(top[2])
 
         cpu_list = {
             "cpu": [
                 {
-                    "used": float(
-                        cpu_stats[0].replace('%Cpu(s):  ', '')
-                        .replace(' us', '')
-                    ),
-                    "idle": float(
-                        cpu_stats[3].replace(' id', '').replace(' ', '')
-                    ),
-                    "1_min": float(
-                        cpu_avg[3].replace('  load average: ', '')
-                    ),
-                    "5_min": float(
-                        cpu_avg[4].replace(' ', '')
-                    ),
-                    "15_min": float(
-                        cpu_avg[5].replace(' ', '')
-                    ),
+                    "used": float(cpu_stats.group(1)),
+                    "idle": float(cpu_stats.group(2)),
+                    "1_min": float(cpu_avg.group(1)),
+                    "5_min": float(cpu_avg.group(2)),
+                    "15_min": float(cpu_avg.group(3)),
                 }
             ]
         }
@@ -222,25 +263,13 @@ class Hardware:
 
         top = self.raw_resources['response']['result']
         top = top.split('\n')
-        mem_stats = top[3].split(',')
-
-        total = (
-            mem_stats[0]
-            .replace('KiB Mem : ', '')
-            .replace(' total', '')
-            .replace(' ', '')
-        )
-        used = (
-            mem_stats[2]
-            .replace(' used', '')
-            .replace(' ', '')
-        )
+        mem_stats = _MEM_RE.search(top[3])
 
         info = {
             "memory": [
                 {
-                    "total": int(total),
-                    "used": int(used)
+                    "total": int(mem_stats.group(1)),
+                    "used": int(mem_stats.group(2))
                 }
             ]
         }
@@ -272,12 +301,15 @@ class Hardware:
         }
 
         disk_list = self.raw_disk['response']['result'].split('\n')
-        for item in disk_list[1::]:
-            entry = {}
-            entry['disk'] = item.split()[0]
-            entry['size'] = item.split()[1]
-            entry['used'] = item.split()[2]
-            storage['disk'].append(entry)
+        for item in disk_list[1:]:
+            parts = item.split()
+            storage['disk'].append(
+                {
+                    'disk': parts[0],
+                    'size': parts[1],
+                    'used': parts[2],
+                }
+            )
 
         return storage
 
@@ -300,25 +332,20 @@ class Hardware:
             List of dictionaries containing temperature information
         """
 
+        dev_temp = (
+            self.raw_env['response']['result']['thermal']['Slot1']['entry']
+        )
+
         info = {
             "temperature": [
                 {
-                    "cpu": '',
-                    "chassis": '',
+                    "cpu": degrees,
+                    "chassis": description,
                 }
+                for degrees, description in map(_TEMP_GET, dev_temp)
             ]
         }
 
-        dev_temp = (
-            self.raw_env['response']['result']['thermal']['Slot1']['entry']
-        )
-
-        for item in dev_temp:
-            entry = {}
-            entry['cpu'] = item['DegreesC']
-            entry['chassis'] = item['description']
-            info['temperature'].append(entry)
-
         return info
 
     def fans(self):
@@ -340,26 +367,20 @@ class Hardware:
             List of dictionaries containing fan information
         """
 
+        fan_data = self.raw_env['response']['result']['fan']['Slot1']['entry']
+
         info = {
             'fan': [
+                {
+                    'fan': description,
+                    'status': 'OK' if alarm == 'False' else 'Alert',
+                    'rpm': rpm,
+                    'detail': '',
+                }
+                for description, alarm, rpm in map(_FAN_GET, fan_data)
             ]
         }
 
-        fan_data = self.raw_env['response']['result']['fan']['Slot1']['entry']
-
-        for item in fan_data:
-            entry = {}
-            entry['fan'] = item['description']
-
-            if item['alarm'] == 'False':
-                entry['status'] = 'OK'
-            else:
-                entry['status'] = 'Alert'
-
-            entry['rpm'] = item['RPMs']
-            entry['detail'] = ''
-            info['fan'].append(entry)
-
         return info
 
 
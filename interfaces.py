@@ -2,7 +2,7 @@
 Get inferface information from PANOS devices
 
 Modules:
-    3rd Party: traceback
+    3rd Party: traceback, concurrent.futures
     Internal: xml_api
 
 Classes:
@@ -13,7 +13,10 @@ Classes:
 
 Functions
 
-    None
+    _format_sub(sub_iface)
+        Format one subinterface as its output dict
+    _format_iface(iface)
+        Format one interface as its output dict
 
 Exceptions:
 
@@ -21,17 +24,114 @@ Exceptions:
 
 Misc Variables:
 
-    None
+    _EMPTY_COUNTERS : dict
+        Placeholder counters for a formatted interface
+    _NA_POE : dict
+        Placeholder PoE block for a formatted interface
 
 Author:
     Luke Robertson - June 2023
 """
 
 import traceback as tb
+from concurrent.futures import ThreadPoolExecutor
 
 import xml_api
 
 
+# Constant sub-dicts of a formatted entry
+#   Counters are not collected, and these firewalls have no PoE
+#   Copied per entry, so callers can't mutate the templates
+_EMPTY_COUNTERS = {
+    'bps_in': '',
+    'bps_out': '',
+    'pps_in': '',
+    'pps_out': '',
+}
+_NA_POE = {
+    'admin': 'N/A',
+    'operational': 'N/A',
+    'max': 'N/A',
+    'used': 'N/A',
+}
+
+
+def _format_sub(sub_iface):
+    """
+    Format one subinterface as its output dict
+
+    Parameters
+    ----------
+    sub_iface : dict
+        The raw subinterface, as collected from the device,
+            with its description stamped on during the join
+
+    Returns
+    -------
+    dict
+        The formatted subinterface
+    """
+
+    entry = {
+        'subinterface': sub_iface['name'],
+        'family': 'Ethernet',
+        'description': sub_iface.get('_desc', ''),
+    }
+    if sub_iface['ip'] != 'N/A':
+        entry['family'] = 'inet'
+        entry['address'] = sub_iface['ip']
+
+    return entry
+
+
+def _format_iface(iface):
+    """
+    Format one interface as its output dict
+
+    Parameters
+    ----------
+    iface : dict
+        The raw interface entry, including the 'phy' and
+            (optionally) 'log' and 'sub' components
+
+    Returns
+    -------
+    dict
+        The formatted interface
+    """
+
+    phy = iface['phy']
+    log = iface.get('log')
+
+    if log is None:
+        family = 'None'
+        address = None
+    elif log['ip'] == 'N/A':
+        family = 'Ethernet'
+        address = None
+    else:
+        family = 'inet'
+        address = log['ip']
+
+    entry = {
+        'name': phy['name'],
+        'mac': phy['mac'],
+        'description': iface['description'],
+        'family': family,
+        'speed': 'None' if phy['state'] == 'down' else phy['speed'],
+        'counters': dict(_EMPTY_COUNTERS),
+        'subinterfaces': [
+            _format_sub(sub_iface)
+            for sub_iface in iface.get('sub', [])
+        ],
+        'poe': dict(_NA_POE),
+    }
+    if address is not None:
+        entry['address'] = address
+
+    return entry
+
+
 class Interfaces:
     """
     Connect to a PANOS device and a list of interfaces
@@ -91,11 +191,19 @@ class Interfaces:
         self.token = token
 
         # Device information
+        self.conn = None
         self.hardware_int = None
         self.logical_int = None
         self.raw_data = None
         self.descriptions = None
 
+        # Lookup tables, built once the raw data is in
+        self._phy_by_name = None
+        self._desc_index = None
+
+        # Memoized interfaces() result
+        self._int_list = None
+
     def __enter__(self):
         """
         Called when the 'with' statement is used
@@ -115,20 +223,53 @@ class Interfaces:
         """
 
         # Connect to PANOS
-        conn = xml_api.XmlApi(self.host, self.token)
-
-        # Collect a list of hardware and logical interfaces
-        #   We can get more detail on each as needed later
-        self.hardware_int = conn.op(xpath='/show/interface', arg='hardware')
-        self.logical_int = conn.op(xpath='/show/interface', arg='logical')
-
-        # Get interface config
-        config = conn.get_config(
-            xpath='/config/devices/entry/network/interface'
-        )
+        #   Keep the connection, so later per-interface
+        #   lookups can reuse it
+        conn = xml_api.get_session(self.host, self.token)
+        self.conn = conn
+
+        # Fresh data is about to arrive; drop any memoized result
+        self._int_list = None
+
+        # Collect a list of hardware and logical interfaces, and the
+        #   interface config
+        #   The three calls are independent; dispatch them concurrently
+        #   so the entry latency is one round-trip, not three
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            f_hw = executor.submit(
+                conn.op, xpath='/show/interface', arg='hardware'
+            )
+            f_log = executor.submit(
+                conn.op, xpath='/show/interface', arg='logical'
+            )
+            f_cfg = executor.submit(
+                conn.get_config,
+                xpath='/config/devices/entry/network/interface'
+            )
+            self.hardware_int = f_hw.result()
+            self.logical_int = f_log.result()
+            config = f_cfg.result()
         self.int_config = config['response']['result']['interface']
         self.log_int = self.logical_int['response']['result']['ifnet']['entry']
 
+        # Index the configured comments by interface name
+        #   Interface names are unique across kinds, so one flat
+        #   dict serves every description lookup
+        vlan_units = self.int_config['vlan']['units'] or {}
+        kind_entries = [
+            self.int_config['ethernet']['entry'],
+            self.int_config['loopback']['units']['entry'],
+            self.int_config['tunnel']['units']['entry'],
+            self.int_config['aggregate-ethernet']['entry'],
+            vlan_units.get('entry'),
+        ]
+
+        self._desc_index = {
+            item['@name']: item.get('comment', '')
+            for entries in kind_entries
+            for item in xml_api.as_list(entries)
+        }
+
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -182,13 +323,13 @@ class Interfaces:
             if '.' in sub['name']:
                 # Get the parent interface name by splitting on the '.'
                 parent = sub['name'].split('.')[0]
-                # Look at each entry in the hardware interface list for a match
-                for iface in self.raw_data['interfaces']:
-                    if iface['phy']['name'] == parent:
-                        if 'sub' not in iface:
-                            iface['sub'] = []
-                        iface['sub'].append(sub)
-                        break
+                # Attach the subinterface to its parent, if there is one
+                #   Stamp the description on while we're here,
+                #   so the formatting pass needs no join
+                iface = self._phy_by_name.get(parent)
+                if iface is not None:
+                    sub['_desc'] = self.descriptions.get(sub['name'], '')
+                    iface.setdefault('sub', []).append(sub)
 
     def sub_description(self):
         """
@@ -209,114 +350,30 @@ class Interfaces:
         """
 
         # Get descriptions for subinterfaces
-        descriptions = {
-            'interface': []
-        }
-
-        interfaces = self.int_config['ethernet']['entry']
-        if type(interfaces) is not list:
-            interfaces = [interfaces]
-        for ethernet in interfaces:
-            if 'layer2' in ethernet and 'units' in ethernet['layer2']:
-                units = ethernet['layer2']['units']['entry']
-                if type(units) is not list:
-                    units = [units]
-                for unit in units:
-                    if 'comment' in unit:
-                        desc = unit['comment']
-                    else:
-                        desc = ''
-                    entry = {}
-                    entry['name'] = unit['@name']
-                    entry['description'] = desc
-                    descriptions['interface'].append(entry)
-            if 'layer3' in ethernet and 'units' in ethernet['layer3']:
-                units = ethernet['layer3']['units']['entry']
-                if type(units) is not list:
-                    units = [units]
-                for unit in units:
-                    if 'comment' in unit:
-                        desc = unit['comment']
-                    else:
-                        desc = ''
-                    entry = {}
-                    entry['name'] = unit['@name']
-                    entry['description'] = desc
-                    descriptions['interface'].append(entry)
-
-        interfaces = self.int_config['loopback']['units']['entry']
-        if type(interfaces) is not list:
-            interfaces = [interfaces]
-        for loopback in interfaces:
-            if '.' in loopback['@name']:
-                if 'comment' in loopback:
-                    desc = loopback['comment']
-                else:
-                    desc = ''
-                entry = {}
-                entry['name'] = loopback['@name']
-                entry['description'] = desc
-                descriptions['interface'].append(entry)
-
-        if self.int_config['vlan']['units'] is not None:
-            interfaces = self.int_config['vlan']['units']['entry']
-            if type(interfaces) is not list:
-                interfaces = [interfaces]
-            for vlan in interfaces:
-                if '.' in vlan['@name']:
-                    if 'comment' in vlan:
-                        desc = vlan['comment']
-                    else:
-                        desc = ''
-                    entry = {}
-                    entry['name'] = vlan['@name']
-                    entry['description'] = desc
-                    descriptions['interface'].append(entry)
-
-        interfaces = self.int_config['tunnel']['units']['entry']
-        if type(interfaces) is not list:
-            interfaces = [interfaces]
-        for tunnel in interfaces:
-            if '.' in tunnel['@name']:
-                if 'comment' in tunnel:
-                    desc = tunnel['comment']
-                else:
-                    desc = ''
-                entry = {}
-                entry['name'] = tunnel['@name']
-                entry['description'] = desc
-                descriptions['interface'].append(entry)
-
-        interfaces = self.int_config['aggregate-ethernet']['entry']
-        if type(interfaces) is not list:
-            interfaces = [interfaces]
-        for ae in interfaces:
-            if 'layer2' in ae and 'units' in ae['layer2']:
-                units = ae['layer2']['units']['entry']
-                if type(units) is not list:
-                    units = [units]
-                for unit in units:
-                    if 'comment' in unit:
-                        desc = unit['comment']
-                    else:
-                        desc = ''
-                    entry = {}
-                    entry['name'] = unit['@name']
-                    entry['description'] = desc
-                    descriptions['interface'].append(entry)
-            if 'layer3' in ae and 'units' in ae['layer3']:
-                units = ae['layer3']['units']['entry']
-                if type(units) is not list:
-                    units = [units]
-                for unit in units:
-                    if 'comment' in unit:
-                        desc = unit['comment']
-                    else:
-                        desc = ''
-                    entry = {}
-                    entry['name'] = unit['@name']
-                    entry['description'] = desc
-                    descriptions['interface'].append(entry)
+        #   Stored flat as name -> description,
+        #   so lookups are a dict probe
+        descriptions = {}
+
+        def collect(units, dot_only=False):
+            # Record the name and comment of each unit
+            for unit in xml_api.as_list(units):
+                if dot_only and '.' not in unit['@name']:
+                    continue
+                descriptions[unit['@name']] = unit.get('comment', '')
+
+        # Ethernet and aggregate-ethernet interfaces keep their units
+        #   under the layer2/layer3 nodes
+        for kind in ('ethernet', 'aggregate-ethernet'):
+            for iface in xml_api.as_list(self.int_config[kind]['entry']):
+                for layer in ('layer2', 'layer3'):
+                    if layer in iface and 'units' in iface[layer]:
+                        collect(iface[layer]['units']['entry'])
+
+        # Loopback, vlan, and tunnel interfaces have a single units
+        #   node; only dotted names are subinterfaces
+        for kind in ('loopback', 'vlan', 'tunnel'):
+            units = self.int_config[kind]['units'] or {}
+            collect(units.get('entry'), dot_only=True)
 
         self.descriptions = descriptions
 
@@ -338,46 +395,8 @@ class Interfaces:
         None
         """
 
-        # Get physical descriptions - Much harder than it should be
-        description = ''
-        if 'ethernet' in iface['name']:
-            for item in self.int_config['ethernet']['entry']:
-                if item['@name'] == iface['name']:
-                    if 'comment' in item:
-                        description = item['comment']
-
-        elif 'loopback' in iface['name']:
-            for item in self.int_config['loopback']['units']['entry']:
-                if item['@name'] == iface['name']:
-                    if 'comment' in item:
-                        description = item['comment']
-
-        elif 'tunnel' in iface['name']:
-            for item in self.int_config['tunnel']['units']['entry']:
-                if item['@name'] == iface['name']:
-                    if 'comment' in item:
-                        description = item['comment']
-
-        elif 'vlan' in iface['name']:
-            if self.int_config['vlan']['units'] is not None:
-                the_interface = self.int_config['vlan']['units']['entry']
-                if type(the_interface) is not list:
-                    the_interface = [the_interface]
-                for item in the_interface:
-                    if item['@name'] == iface['name']:
-                        if 'comment' in item:
-                            description = item['comment']
-
-        elif 'ae' in iface['name']:
-            the_interface = self.int_config['aggregate-ethernet']['entry']
-            if type(the_interface) is not list:
-                the_interface = [the_interface]
-            for item in the_interface:
-                if item['@name'] == iface['name']:
-                    if 'comment' in item:
-                        description = item['comment']
-
-        return description
+        # Look up the comment in the index built in __enter__
+        return self._desc_index.get(iface['name'], '')
 
     def raw_interfaces(self):
         """
@@ -405,28 +424,47 @@ class Interfaces:
             "interfaces": []
         }
 
+        # Index the logical interfaces by name,
+        #   so alignment is a lookup rather than a scan per interface
+        log_by_name = {log['name']: log for log in self.log_int}
+
         # Loop through physical interfaces, record this information
         for iface in phy_int:
             entry = {}
             entry['phy'] = iface
 
             # Align logical interfaces (not subinterfaces) with physical
-            for log in self.log_int:
-                if log['name'] == iface['name']:
-                    entry['log'] = log
-                    break
-
-            # Collect detailed information for this specific interface
-            conn = xml_api.XmlApi(self.host, self.token)
-            interface = conn.op(xpath='/show/interface', arg=iface['name'])
-            entry['detail'] = interface
+            log = log_by_name.get(iface['name'])
+            if log is not None:
+                entry['log'] = log
 
             entry['description'] = self.phy_description(iface)
 
             raw_data['interfaces'].append(entry)
 
+        # Collect detailed information for each interface
+        #   One request per interface; dispatch them concurrently
+        #   over the shared connection, so the total time is the
+        #   slowest request rather than the sum of them all
+        conn = self.conn
+        names = [entry['phy']['name'] for entry in raw_data['interfaces']]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            details = executor.map(
+                lambda name: conn.op(xpath='/show/interface', arg=name),
+                names
+            )
+            for entry, detail in zip(raw_data['interfaces'], details):
+                entry['detail'] = detail
+
         self.raw_data = raw_data
 
+        # Index the entries by physical name for the subinterface join
+        self._phy_by_name = {
+            entry['phy']['name']: entry
+            for entry in raw_data['interfaces']
+        }
+
     def interfaces(self):
         """
         Collect detailed interface information
@@ -447,78 +485,32 @@ class Interfaces:
             List of interfaces and their information
         """
 
+        # The raw data doesn't change within a 'with' block,
+        #   so repeated calls return the memoized result
+        if self._int_list is not None:
+            return self._int_list
+
         # Collect raw interface data
         self.raw_interfaces()
 
-        # Connect subinterfaces to their parent interfaces
-        self.sub_interfaces()
-
         # Collect sub-interface descriptions
+        #   Must happen before the join below, which stamps
+        #   descriptions onto the subinterfaces
         self.sub_description()
 
+        # Connect subinterfaces to their parent interfaces
+        self.sub_interfaces()
+
+        # We have a lot of interface data availble
+        # Let's parse it into a more usable format
         int_list = {
             "interfaces": [
+                _format_iface(iface)
+                for iface in self.raw_data['interfaces']
             ]
         }
 
-        # We have a lot of interface data availble
-        # Let's parse it into a more usable format
-        for iface in self.raw_data['interfaces']:
-            entry = {}
-            entry['name'] = iface['phy']['name']
-            entry['mac'] = iface['phy']['mac']
-            entry['description'] = iface['description']
-
-            if 'log' not in iface:
-                entry['family'] = "None"
-            elif iface['log']['ip'] == "N/A":
-                entry['family'] = "Ethernet"
-            else:
-                entry['family'] = "inet"
-                entry['address'] = iface['log']['ip']
-
-            if iface['phy']['state'] == "down":
-                entry['speed'] = "None"
-            else:
-                entry['speed'] = iface['phy']['speed']
-
-            # Get Counters
-            entry['counters'] = {}
-            entry['counters']['bps_in'] = ''
-            entry['counters']['bps_out'] = ''
-            entry['counters']['pps_in'] = ''
-            entry['counters']['pps_out'] = ''
-
-            # Get subinterfaces
-            entry['subinterfaces'] = []
-            if 'sub' in iface:
-                for sub_iface in iface['sub']:
-                    sub_entry = {}
-                    sub_entry['subinterface'] = sub_iface['name']
-
-                    if sub_iface['ip'] == "N/A":
-                        sub_entry['family'] = "Ethernet"
-                    else:
-                        sub_entry['family'] = "inet"
-                        sub_entry['address'] = sub_iface['ip']
-
-                    for desc in self.descriptions['interface']:
-                        if desc['name'] == sub_iface['name']:
-                            sub_entry['description'] = desc['description']
-                            break
-                    # sub_entry['description'] = ''
-                    entry['subinterfaces'].append(sub_entry)
-
-            # No PoE on these firewalls
-            entry['poe'] = {}
-            entry['poe']['admin'] = 'N/A'
-            entry['poe']['operational'] = 'N/A'
-            entry['poe']['max'] = 'N/A'
-            entry['poe']['used'] = 'N/A'
-
-            # Append to list
-            int_list['interfaces'].append(entry)
-
+        self._int_list = int_list
         return int_list
 
 
@@ -12,7 +12,10 @@ Classes:
 
 Functions
 
-    None
+    _mgmt_pair(mgmt)
+        Extract the MAC and IP from a management-address node
+    _format_neighbour(neighbour)
+        Format one LLDP neighbour as its output dict
 
 Exceptions:
 
@@ -31,6 +34,64 @@ import traceback as tb
 import xml_api
 
 
+def _mgmt_pair(mgmt):
+    """
+    Extract the MAC and IP from a management-address node
+
+    Parameters
+    ----------
+    mgmt : dict | None
+        The management-address node, if the neighbour shared one
+
+    Returns
+    -------
+    tuple
+        The (mac, ip) pair; either may be an empty string
+    """
+
+    mac = ip = ''
+    if mgmt is not None:
+        for address in xml_api.as_list(mgmt['entry']):
+            if address['address-type'] == "MAC":
+                mac = address['@name']
+            else:
+                ip = address['@name']
+
+    return mac, ip
+
+
+def _format_neighbour(neighbour):
+    """
+    Format one LLDP neighbour as its output dict
+
+    Parameters
+    ----------
+    neighbour : dict
+        The raw neighbour entry, as collected from the device
+
+    Returns
+    -------
+    dict
+        The formatted neighbour
+    """
+
+    # The interesting fields all live under the same node
+    n_entry = neighbour['neighbors']['entry']
+    mac, ip = _mgmt_pair(n_entry.get('management-address'))
+
+    # PANOS doesn't provide the model, serial, or vendor
+    return {
+        'model': '',
+        'serial': '',
+        'vendor': '',
+        'name': neighbour['@name'],
+        'system': n_entry['system-name'],
+        'description': n_entry['system-description'],
+        'mac': mac,
+        'ip': ip,
+    }
+
+
 class Lldp:
     """
     Connect to a PANOS device and get a list of LLDP neighbours
@@ -102,7 +163,7 @@ class Lldp:
         """
 
         # Connect to PANOS
-        conn = xml_api.XmlApi(self.host, self.token)
+        conn = xml_api.get_session(self.host, self.token)
 
         # Collect a list LLDP neighbours
         self.raw_lldp = conn.op(xpath='/show/lldp/neighbors', arg='all')
@@ -157,56 +218,19 @@ class Lldp:
             List of LLDP neighbours
         """
 
-        lldp_list = {
-            "interfaces": []
+        neighbour_list = xml_api.as_list(
+            self.raw_lldp['response']['result']['entry']
+        )
+
+        # Interfaces with no neighbour have an empty 'neighbors' node
+        return {
+            "interfaces": [
+                _format_neighbour(neighbour)
+                for neighbour in neighbour_list
+                if neighbour['neighbors'] is not None
+            ]
         }
 
-        neighbour_list = self.raw_lldp['response']['result']['entry']
-        if type(neighbour_list) is not list:
-            neighbour_list = [neighbour_list]
-
-        for neighbour in neighbour_list:
-            # If there are no neighbours, skip
-            if neighbour['neighbors'] is None:
-                continue
-
-            entry = {}
-
-            # PANOS doesn't provide this information
-            entry['model'] = ''
-            entry['serial'] = ''
-            entry['vendor'] = ''
-
-            # Get general information
-            entry['name'] = neighbour['@name']
-            entry['system'] = neighbour['neighbors']['entry']['system-name']
-            entry['description'] = (
-                neighbour['neighbors']['entry']['system-description']
-            )
-
-            # Get the MAC and/or the IP address if available
-            entry['mac'] = ''
-            entry['ip'] = ''
-            if 'management-address' in neighbour['neighbors']['entry']:
-                mgmt = (
-                    neighbour
-                    ['neighbors']
-                    ['entry']
-                    ['management-address']
-                    ['entry']
-                )
-                if type(mgmt) is not list:
-                    mgmt = [mgmt]
-                for address in mgmt:
-                    if address['address-type'] == "MAC":
-                        entry['mac'] = address['@name']
-                    else:
-                        entry['ip'] = address['@name']
-
-            lldp_list['interfaces'].append(entry)
-
-        return lldp_list
-
 
 # Handle running as a script
 if __name__ == '__main__':
@@ -2,7 +2,7 @@
 Get MAC table information from PANOS devices
 
 Modules:
-    3rd Party: traceback
+    3rd Party: logging, operator
     Internal: xml_api
 
 Classes:
@@ -20,17 +20,25 @@ Exceptions:
 
 Misc Variables:
 
-    None
+    _MAC_GET : operator.itemgetter
+        Extracts the fields of a MAC table row in one call
 
 Author:
     Luke Robertson - June 2023
 """
 
-import traceback as tb
+import logging
+from operator import itemgetter
 
 import xml_api
 
 
+logger = logging.getLogger(__name__)
+
+# Extract the fields of a MAC table row in one call
+_MAC_GET = itemgetter('mac', 'vlan', 'interface')
+
+
 class Mac:
     """
     Connect to a PANOS device and get the MAC table
@@ -56,6 +64,14 @@ class Mac:
         Get a the MAC address table
     """
 
+    # Fixed attribute layout
+    #   Shrinks instances and speeds up attribute access
+    __slots__ = (
+        'host',
+        'token',
+        'raw_mac',
+    )
+
     def __init__(self, host, token):
         """
         Class constructor
@@ -127,14 +143,18 @@ class Mac:
             None
         """
 
-        # handle errors that were raised
+        # Log errors that were raised
+        #   The traceback is only formatted if logging emits the record
         if exc_type:
-            print(
-                f"Exception of type {exc_type.__name__} occurred: {exc_value}"
+            logger.error(
+                "Exception of type %s occurred: %s",
+                exc_type.__name__,
+                exc_value,
+                exc_info=(exc_type, exc_value, traceback)
             )
-            if traceback:
-                print("Traceback:")
-                print(tb.format_tb(traceback))
+
+        # Never suppress the exception
+        return False
 
     def mac(self):
         """
@@ -155,14 +175,12 @@ class Mac:
             List of MAC addresses
         """
 
-        table = self.raw_mac['response']['result']['entries']
-        if type(table) is not list:
-            table = [table]
+        table = xml_api.as_list(self.raw_mac['response']['result']['entries'])
 
         # If the FW is in L3 mode, there won't be any entries
         # Remember, this is not ARP, its the MAC table
-        if table[0] is None:
-            mac_list = {
+        if not table or table[0] is None:
+            return {
                 "entry": [
                     {
                         "mac": '',
@@ -172,17 +190,18 @@ class Mac:
                 ]
             }
 
-        # Otherwise, get all the entries
+        # Otherwise, get all the entries in one pass
         # This has not been fully tested
-        else:
-            for item in table:
-                entry = {}
-                entry['mac'] = item['mac']
-                entry['vlan'] = item['vlan']
-                entry['interface'] = item['interface']
-                mac_list.append(entry)
-
-        return mac_list
+        return {
+            "entry": [
+                {
+                    "mac": mac,
+                    "vlan": vlan,
+                    "interface": interface,
+                }
+                for mac, vlan, interface in map(_MAC_GET, table)
+            ]
+        }
 
 
 # Handle running as a script
@@ -2,7 +2,7 @@
 Get OSPF information from PANOS devices
 
 Modules:
-    3rd Party: traceback
+    3rd Party: logging, collections, concurrent.futures
     Internal: xml_api
 
 Classes:
@@ -20,17 +20,32 @@ Exceptions:
 
 Misc Variables:
 
-    None
+    _OSPF_XPATHS : dict
+        The xpaths for the four OSPF tables
 
 Author:
     Luke Robertson - June 2023
 """
 
-import traceback as tb
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 import xml_api
 
 
+logger = logging.getLogger(__name__)
+
+# The xpaths for the four OSPF tables, keyed on the attribute
+#   that stores each raw response
+_OSPF_XPATHS = {
+    'ospf_summary': '/show/routing/protocol/ospf/summary',
+    'ospf_area': '/show/routing/protocol/ospf/area',
+    'ospf_neighbor': '/show/routing/protocol/ospf/neighbor',
+    'ospf_interface': '/show/routing/protocol/ospf/interface',
+}
+
+
 class Ospf:
     """
     Connect to a PANOS device and get OSPF information
@@ -56,6 +71,17 @@ class Ospf:
         Get the OSPF summary
     """
 
+    # Fixed attribute layout
+    #   Shrinks instances and speeds up attribute access
+    __slots__ = (
+        'host',
+        'token',
+        'ospf_summary',
+        'ospf_area',
+        'ospf_neighbor',
+        'ospf_interface',
+    )
+
     def __init__(self, host, token):
         """
         Class constructor
@@ -107,25 +133,16 @@ class Ospf:
         # Connect to PANOS
         conn = xml_api.XmlApi(self.host, self.token)
 
-        # Collect general OSPF information
-        self.ospf_summary = conn.op(
-            xpath='/show/routing/protocol/ospf/summary'
-        )
-
-        # Collect OSPF area information
-        self.ospf_area = conn.op(
-            xpath='/show/routing/protocol/ospf/area'
-        )
-
-        # Collect OSPF neighbor information
-        self.ospf_neighbor = conn.op(
-            xpath='/show/routing/protocol/ospf/neighbor'
-        )
-
-        # Collect OSPF interface information
-        self.ospf_interface = conn.op(
-            xpath='/show/routing/protocol/ospf/interface'
-        )
+        # Collect general, area, neighbor, and interface information
+        #   The four calls are independent; dispatch them concurrently
+        #   so the entry latency is one round-trip, not four
+        with ThreadPoolExecutor(max_workers=len(_OSPF_XPATHS)) as executor:
+            futures = {
+                attr: executor.submit(conn.op, xpath=xpath)
+                for attr, xpath in _OSPF_XPATHS.items()
+            }
+            for attr, future in futures.items():
+                setattr(self, attr, future.result())
 
         return self
 
@@ -147,14 +164,18 @@ class Ospf:
             None
         """
 
-        # handle errors that were raised
+        # Log errors that were raised
+        #   The traceback is only formatted if logging emits the record
         if exc_type:
-            print(
-                f"Exception of type {exc_type.__name__} occurred: {exc_value}"
+            logger.error(
+                "Exception of type %s occurred: %s",
+                exc_type.__name__,
+                exc_value,
+                exc_info=(exc_type, exc_value, traceback)
             )
-            if traceback:
-                print("Traceback:")
-                print(tb.format_tb(traceback))
+
+        # Never suppress the exception
+        return False
 
     def summary(self):
         """
@@ -180,25 +201,18 @@ class Ospf:
             "interface": [],
         }
 
-        # Prepare the source information
-        general_ospf = self.ospf_summary['response']['result']['entry']
-        if type(general_ospf) is not list:
-            general_ospf = [general_ospf]
-
-        area_list = self.ospf_area['response']['result']['entry']
-        if type(area_list) is not list:
-            area_list = [area_list]
-
-        if 'entry' in self.ospf_neighbor['response']['result']:
-            neighbour_list = self.ospf_neighbor['response']['result']['entry']
-            if type(neighbour_list) is not list:
-                neighbour_list = [neighbour_list]
-        else:
-            neighbour_list = []
+        # Walk down to each response's result node once
+        sum_res = self.ospf_summary['response']['result']
+        area_res = self.ospf_area['response']['result']
+        nbr_res = self.ospf_neighbor['response']['result']
+        int_res = self.ospf_interface['response']['result']
 
-        interface_list = self.ospf_interface['response']['result']['entry']
-        if type(interface_list) is not list:
-            interface_list = [interface_list]
+        # Prepare the source information
+        #   as_list normalises the single-vs-list-vs-missing shapes
+        general_ospf = xml_api.as_list(sum_res['entry'])
+        area_list = xml_api.as_list(area_res['entry'])
+        neighbour_list = xml_api.as_list(nbr_res.get('entry'))
+        interface_list = xml_api.as_list(int_res['entry'])
 
         # Collect general OSPF information
         for ospf_entry in general_ospf:
@@ -209,6 +223,12 @@ class Ospf:
             ospf['id'] = ospf_entry['router-id']
             ospf['reference'] = "100m"
 
+        # Count neighbours per area in one pass,
+        #   rather than rescanning the neighbour list per area
+        nbr_by_area = Counter(
+            neighbour['area-id'] for neighbour in neighbour_list
+        )
+
         # Collect area information
         for area in area_list:
             # Only support the default instance
@@ -223,11 +243,7 @@ class Ospf:
             entry['authentication'] = None
 
             # Collect the neighbour count per area
-            counter = 0
-            for neighbour in neighbour_list:
-                if neighbour['area-id'] == entry['id']:
-                    counter += 1
-            entry['neighbours'] = counter
+            entry['neighbours'] = nbr_by_area[entry['id']]
 
             ospf['areas'].append(entry)
 
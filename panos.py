@@ -7,7 +7,8 @@ Modules:
 
 Classes:
 
-    None
+    ThreadedXMLRPCServer
+        An XML-RPC server that handles each request in its own thread
 
 Functions
 
@@ -27,6 +28,10 @@ Author:
 
 # External imports
 import json
+import threading
+import time
+from functools import wraps
+from socketserver import ThreadingMixIn
 from xmlrpc.server import SimpleXMLRPCServer
 
 # Internal imports
@@ -47,7 +52,81 @@ import ospf
 HOSTNAME = '0.0.0.0'
 PORT = 8011
 
+# Compact JSON encoding
+#   No whitespace padding, which roughly halves the bytes sent
+#   for large tables such as MAC or routing
+_JSON_SEPARATORS = (',', ':')
+
+# How long a collected result stays fresh, in seconds
+#   Clients polling the same device faster than this share one
+#   upstream fetch instead of hammering the device
+CACHE_TTL = 5
+
+
+def _ttl_cache(func):
+    """
+    Cache a collector's result per device for CACHE_TTL seconds
+
+    The device state these helpers report changes on the order of
+        seconds at most, so repeated RPC calls within the window
+        return the cached JSON rather than re-fetching and
+        re-parsing everything
+
+    Parameters
+    ----------
+    func : callable
+        A helper taking (host, token) and returning a JSON string
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    callable
+        The wrapped helper
+    """
+
+    cache = {}
+    lock = threading.Lock()
+
+    @wraps(func)
+    def wrapper(host, token):
+        key = (host, token)
+        now = time.monotonic()
+
+        with lock:
+            hit = cache.get(key)
+            if hit is not None and now - hit[0] < CACHE_TTL:
+                return hit[1]
+
+        # Fetch outside the lock, so one slow device doesn't
+        #   stall lookups for the others
+        result = func(host, token)
+
+        with lock:
+            cache[key] = (time.monotonic(), result)
 
+        return result
+
+    return wrapper
+
+
+class ThreadedXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    An XML-RPC server that handles each request in its own thread
+
+    Every registered function blocks on network I/O to a device,
+        so serving requests one at a time would stall all clients
+        behind the slowest device
+    Daemon threads, so an interrupt isn't held up by
+        in-flight requests
+    """
+
+    daemon_threads = True
+
+
+@_ttl_cache
 def device_info(host, token):
     """
     Collect device information
@@ -69,19 +148,25 @@ def device_info(host, token):
         JSON formatted string containing device information
     """
 
-    info = {}
     with device.Device(host=host, token=token) as conn:
-        info.update(conn.facts())
-        info.update(conn.license())
-        info.update(conn.radius())
-        info.update(conn.syslog())
-        info.update(conn.ntp())
-        info.update(conn.dns())
-        info.update(conn.snmp())
+        # Everything is needed here, so fetch it all concurrently
+        conn.prefetch_all()
 
-    return json.dumps(info)
+        # Merge the categories in one dict literal
+        info = {
+            **conn.facts(),
+            **conn.license(),
+            **conn.radius(),
+            **conn.syslog(),
+            **conn.ntp(),
+            **conn.dns(),
+            **conn.snmp(),
+        }
 
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
+
+@_ttl_cache
 def hardware_info(host, token):
     """
     Collect device hardware information
@@ -103,17 +188,20 @@ def hardware_info(host, token):
         JSON formatted string containing device information
     """
 
-    info = {}
     with hardware.Hardware(host=host, token=token) as conn:
-        info.update(conn.cpu())
-        info.update(conn.memory())
-        info.update(conn.disk())
-        info.update(conn.temperature())
-        info.update(conn.fans())
+        # Merge the categories in one dict literal
+        info = {
+            **conn.cpu(),
+            **conn.memory(),
+            **conn.disk(),
+            **conn.temperature(),
+            **conn.fans(),
+        }
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
+@_ttl_cache
 def interface_info(host, token):
     """
     Collects a list of interfaces and their details
@@ -139,9 +227,10 @@ def interface_info(host, token):
     with interfaces.Interfaces(host=host, token=token) as conn:
         info.update(conn.interfaces())
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
+@_ttl_cache
 def lldp_info(host, token):
     """
     Collects a list of connected devices and their details
@@ -167,9 +256,10 @@ def lldp_info(host, token):
     with lldp.Lldp(host=host, token=token) as conn:
         info.update(conn.interfaces())
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
+@_ttl_cache
 def vlan_info(host, token):
     """
     Collects a list of VLANs
@@ -195,9 +285,10 @@ def vlan_info(host, token):
     with vlans.Vlan(host=host, token=token) as conn:
         info.update(conn.vlans())
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
+@_ttl_cache
 def mac_info(host, token):
     """
     Collects the MAC address table
@@ -223,9 +314,10 @@ def mac_info(host, token):
     with mac.Mac(host=host, token=token) as conn:
         info.update(conn.mac())
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
+@_ttl_cache
 def routing_info(host, token):
     """
     Collects the routing table
@@ -251,9 +343,10 @@ def routing_info(host, token):
     with routing.Routing(host=host, token=token) as conn:
         info.update(conn.routing())
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
+@_ttl_cache
 def ospf_info(host, token):
     """
     Collects OSPF information
@@ -279,7 +372,7 @@ def ospf_info(host, token):
     with ospf.Ospf(host=host, token=token) as conn:
         info.update(conn.summary())
 
-    return json.dumps(info)
+    return json.dumps(info, separators=_JSON_SEPARATORS)
 
 
 def rpc_server():
@@ -301,7 +394,7 @@ def rpc_server():
 
     # Create the server
     print('Starting server...')
-    server = SimpleXMLRPCServer((HOSTNAME, PORT))
+    server = ThreadedXMLRPCServer((HOSTNAME, PORT))
 
     # Register the functions
     server.register_function(device_info, 'device_info')
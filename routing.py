@@ -2,8 +2,8 @@
 Get routing table information from PANOS devices
 
 Modules:
-    3rd Party: traceback
-    Internal: xml_api
+    3rd Party: None
+    Internal: xml_api, collector
 
 Classes:
 
@@ -12,7 +12,8 @@ Classes:
 
 Functions
 
-    None
+    _route_entry(route)
+        Convert one raw route into the formatted entry shape
 
 Exceptions:
 
@@ -20,22 +21,100 @@ Exceptions:
 
 Misc Variables:
 
-    None
+    _FLAG_STRIP : dict
+        Translation table removing non-protocol flag characters
+    _PROTOCOL_MAP : dict
+        Maps a flag code to a protocol name
+    _get_route_fields : operator.itemgetter
+        Extracts every needed field from a raw route in one call
 
 Author:
     Luke Robertson - June 2023
 """
 
-import traceback as tb
+from operator import itemgetter
 
 import xml_api
+from collector import PanosQuery
+
+
+# Strip the flag characters that don't identify the protocol
+#   One translate call makes a single pass over the string,
+#   rather than one pass per replaced character
+_FLAG_STRIP = str.maketrans('', '', 'A?EM~ ')
+
+# Map the remaining flag code to a protocol name
+#   Codes with no mapping fall through as-is
+_PROTOCOL_MAP = {
+    'H': 'host',
+    'C': 'connected',
+    'S': 'static',
+    'B': 'bgp',
+    'R': 'rip',
+    'Oi': 'ospf intra-area',
+    'Oo': 'ospf inter-area',
+    'O1': 'ospf external type 1',
+    'O2': 'ospf external type 2',
+    'O': 'ospf',
+}
+
+# Extract every needed field from a raw route in one call,
+#   rather than one dict index per field
+_get_route_fields = itemgetter(
+    'destination',
+    'metric',
+    'flags',
+    'nexthop',
+    'interface',
+    'virtual-router',
+    'route-table',
+)
+
+
+def _route_entry(route):
+    """
+    Convert one raw route into the formatted entry shape
+
+    One straight-line function for the fixed operational-command
+        schema, shared by every routing() call
 
+    Parameters
+    ----------
+    route : dict
+        One raw route from the parsed response
+
+    Raises
+    ------
+    None
 
-class Routing:
+    Returns
+    -------
+    dict
+        The formatted route entry
+    """
+
+    # Parse the flags to get the protocol
+    route_type = route['flags'].translate(_FLAG_STRIP)
+
+    return {
+        'route': route['destination'],
+        'metric': route['metric'],
+        'protocol': _PROTOCOL_MAP.get(route_type, route_type),
+        'next-hop': [
+            {
+                "hop": route['nexthop'],
+                "interface": route['interface']
+            }
+        ],
+    }
+
+
+class Routing(PanosQuery):
     """
     Connect to a PANOS device and get the routing table
 
     Supports being instantiated with the 'with' statement
+    The constructor and context handling come from PanosQuery
 
     Attributes
     ----------
@@ -46,46 +125,22 @@ class Routing:
 
     Methods
     -------
-    __init__(host, user, password)
-        Class constructor
-    __enter__()
-        Called when the 'with' statement is used
-    __exit__(exc_type, exc_value, traceback)
-        Called when the 'with' statement is finished
     routing()
         Get a the MAC address table
+    routing_soa()
+        Get the routing table as parallel lists, one per field
+    routing_iter()
+        Stream the routing table, one route at a time
     """
 
-    def __init__(self, host, token):
-        """
-        Class constructor
+    # The command to run, and where the raw response lands
+    XPATH = '/show/routing/route'
+    ATTR = 'raw_routing'
 
-        Parameters
-        ----------
-        host : str
-            IP address or FQDN of the device to connect to
-        token : str
-            API token to use for authentication
-
-        Raises
-        ------
-        None
-
-        Returns
-        -------
-        None
-        """
-
-        # Authentication information
-        self.host = host
-        self.token = token
-
-        # Device information
-        self.raw_routing = None
-
-    def __enter__(self):
+    def routing(self):
         """
-        Called when the 'with' statement is used
+        Collect the routing table
+        Including route, protocol, metric, nexthop, and interface
 
         Parameters
         ----------
@@ -97,21 +152,38 @@ class Routing:
 
         Returns
         -------
-        self
-            The instantiated object
+        route_list : list
+            List of routes
         """
 
-        # Connect to PANOS
-        conn = xml_api.XmlApi(self.host, self.token)
+        # as_list normalises the single-vs-list-vs-missing shapes
+        routes = xml_api.as_list(
+            self.raw_routing['response']['result']['entry']
+        )
 
-        # Collect the MAC table
-        self.raw_routing = conn.op(xpath='/show/routing/route')
+        # Only supporting unicast in the default routing instance
+        route_list = {
+            "entry": [
+                _route_entry(route)
+                for route in routes
+                if (
+                    (route['virtual-router'], route['route-table'])
+                    == ('default', 'unicast')
+                )
+            ]
+        }
 
-        return self
+        return route_list
 
-    def __exit__(self, exc_type, exc_value, traceback):
+    def routing_soa(self):
         """
-        Called when the 'with' statement is finished
+        Collect the routing table as parallel lists
+
+        An alternative to routing() for callers that only need
+            one or two fields; each field is one flat list,
+            rather than a dict and a list per route
+        Index n of every list refers to the same route, so the
+            lists can be filtered or joined column-wise
 
         Parameters
         ----------
@@ -123,23 +195,58 @@ class Routing:
 
         Returns
         -------
-        self
-            None
+        dict
+            Parallel lists; routes, metrics, protocols,
+                next_hops, and interfaces
         """
 
-        # handle errors that were raised
-        if exc_type:
-            print(
-                f"Exception of type {exc_type.__name__} occurred: {exc_value}"
+        routes = []
+        metrics = []
+        protocols = []
+        next_hops = []
+        interfaces = []
+
+        # as_list normalises the single-vs-list-vs-missing shapes
+        raw_routes = xml_api.as_list(
+            self.raw_routing['response']['result']['entry']
+        )
+
+        for route in raw_routes:
+            # All seven fields in one extraction
+            dest, metric, flags, nexthop, interface, v_router, table = (
+                _get_route_fields(route)
             )
-            if traceback:
-                print("Traceback:")
-                print(tb.format_tb(traceback))
 
-    def routing(self):
+            # Only supporting unicast in the default routing instance
+            if (v_router, table) != ('default', 'unicast'):
+                continue
+
+            # Parse the flags to get the protocol
+            route_type = flags.translate(_FLAG_STRIP)
+
+            routes.append(dest)
+            metrics.append(metric)
+            protocols.append(_PROTOCOL_MAP.get(route_type, route_type))
+            next_hops.append(nexthop)
+            interfaces.append(interface)
+
+        return {
+            "routes": routes,
+            "metrics": metrics,
+            "protocols": protocols,
+            "next_hops": next_hops,
+            "interfaces": interfaces,
+        }
+
+    def routing_iter(self):
         """
-        Collect the routing table
-        Including route, protocol, metric, nexthop, and interface
+        Stream the routing table, one formatted route at a time
+
+        Unlike routing(), this never holds the whole table in
+            memory; entries are parsed from the streamed response
+            and released as they are consumed
+        Useful for very large tables, where the nested-dict
+            pipeline's peak memory matters
 
         Parameters
         ----------
@@ -149,75 +256,40 @@ class Routing:
         ------
         None
 
-        Returns
-        -------
-        route_list : list
-            List of routes
+        Yields
+        ------
+        dict
+            One formatted route, in the same shape as the
+                entries routing() returns
         """
 
-        route_list = {
-            "entry": []
-        }
+        conn = xml_api.get_session(self.host, self.token)
 
-        routes = self.raw_routing['response']['result']['entry']
-        if type(routes) is not list:
-            routes = [routes]
-
-        for route in routes:
+        for element in conn.op_stream(xpath='/show/routing/route'):
             # Only supporting the default routing instance
-            if route['virtual-router'] != 'default':
+            if element.findtext('virtual-router') != 'default':
                 continue
 
             # Only supporting unicast
-            if route['route-table'] != 'unicast':
+            if element.findtext('route-table') != 'unicast':
                 continue
 
-            entry = {}
-            entry['route'] = route['destination']
-            entry['metric'] = route['metric']
-
-            # Parse the flags to get the prococol
-            route_type = route['flags'].replace('A', '')
-            route_type = route_type.replace('?', '')
-            route_type = route_type.replace('E', '')
-            route_type = route_type.replace('M', '')
-            route_type = route_type.replace('~', '')
-            route_type = route_type.replace(' ', '')
-
-            match route_type:
-                case 'H':
-                    entry['protocol'] = 'host'
-                case 'C':
-                    entry['protocol'] = 'connected'
-                case 'S':
-                    entry['protocol'] = 'static'
-                case 'B':
-                    entry['protocol'] = 'bgp'
-                case 'R':
-                    entry['protocol'] = 'rip'
-                case 'Oi':
-                    entry['protocol'] = 'ospf intra-area'
-                case 'Oo':
-                    entry['protocol'] = 'ospf inter-area'
-                case 'O1':
-                    entry['protocol'] = 'ospf external type 1'
-                case 'O2':
-                    entry['protocol'] = 'ospf external type 2'
-                case 'O':
-                    entry['protocol'] = 'ospf'
-                case _:
-                    entry['protocol'] = route_type
-
-            entry['next-hop'] = [
-                {
-                    "hop": route['nexthop'],
-                    "interface": route['interface']
-                }
-            ]
-
-            route_list['entry'].append(entry)
+            # Parse the flags to get the protocol
+            route_type = (
+                element.findtext('flags', '').translate(_FLAG_STRIP)
+            )
 
-        return route_list
+            yield {
+                'route': element.findtext('destination'),
+                'metric': element.findtext('metric'),
+                'protocol': _PROTOCOL_MAP.get(route_type, route_type),
+                'next-hop': [
+                    {
+                        "hop": element.findtext('nexthop'),
+                        "interface": element.findtext('interface')
+                    }
+                ],
+            }
 
 
 # Handle running as a script
@@ -2,8 +2,8 @@
 Get VLAN information from PANOS devices
 
 Modules:
-    3rd Party: traceback
-    Internal: xml_api
+    3rd Party: None
+    Internal: xml_api, collector
 
 Classes:
 
@@ -26,16 +26,16 @@ Author:
     Luke Robertson - June 2023
 """
 
-import traceback as tb
-
 import xml_api
+from collector import PanosQuery
 
 
-class Vlan:
+class Vlan(PanosQuery):
     """
     Connect to a PANOS device and get VLAN information
 
     Supports being instantiated with the 'with' statement
+    The constructor and context handling come from PanosQuery
 
     Attributes
     ----------
@@ -46,95 +46,14 @@ class Vlan:
 
     Methods
     -------
-    __init__(host, user, password)
-        Class constructor
-    __enter__()
-        Called when the 'with' statement is used
-    __exit__(exc_type, exc_value, traceback)
-        Called when the 'with' statement is finished
     vlans()
         Get a list of vlans on the device
     """
 
-    def __init__(self, host, token):
-        """
-        Class constructor
-
-        Parameters
-        ----------
-        host : str
-            IP address or FQDN of the device to connect to
-        token : str
-            API token to use for authentication
-
-        Raises
-        ------
-        None
-
-        Returns
-        -------
-        None
-        """
-
-        # Authentication information
-        self.host = host
-        self.token = token
-
-        # Device information
-        self.raw_vlans = None
-
-    def __enter__(self):
-        """
-        Called when the 'with' statement is used
-
-        Parameters
-        ----------
-        None
-
-        Raises
-        ------
-        None
-
-        Returns
-        -------
-        self
-            The instantiated object
-        """
-
-        # Connect to PANOS
-        conn = xml_api.XmlApi(self.host, self.token)
-
-        # Collect a list of VLANs
-        self.raw_vlans = conn.op(xpath='/show/vlan', arg='all')
-
-        return self
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        """
-        Called when the 'with' statement is finished
-
-        Parameters
-        ----------
-        None
-
-        Raises
-        ------
-        None
-
-        Returns
-        -------
-        self
-            None
-        """
-
-        # handle errors that were raised
-        if exc_type:
-            print(
-                f"Exception of type {exc_type.__name__} occurred: {exc_value}"
-            )
-            if traceback:
-                print("Traceback:")
-                print(tb.format_tb(traceback))
+    # The command to run, and where the raw response lands
+    XPATH = '/show/vlan'
+    ARG = 'all'
+    ATTR = 'raw_vlans'
 
     def vlans(self):
         """
@@ -155,23 +74,27 @@ class Vlan:
             List of VLANs
         """
 
+        # as_list normalises the single-vs-list-vs-missing shapes
+        vlans = xml_api.as_list(
+            self.raw_vlans['response']['result']['entries']['entry']
+        )
+
+        # Build the list in one comprehension
+        #   split('.', 1) stops at the first dot, as the id is
+        #   everything after it
         vlan_list = {
-            "vlans": []
+            "vlans": [
+                {
+                    "id": vlan['vif'].split('.', 1)[1],
+                    "name": vlan['name'],
+                    "description": '',
+                    "irb": vlan['vif'],
+                }
+                for vlan in vlans
+                if vlan.get('vif') is not None
+            ]
         }
 
-        vlans = self.raw_vlans['response']['result']['entries']['entry']
-        if type(vlans) is not list:
-            vlans = [vlans]
-
-        for vlan in vlans:
-            if vlan['vif'] is not None:
-                entry = {}
-                entry['id'] = vlan['vif'].split('.')[1]
-                entry['name'] = vlan['name']
-                entry['description'] = ''
-                entry['irb'] = vlan['vif']
-                vlan_list['vlans'].append(entry)
-
         return vlan_list
 
 
@@ -3,6 +3,7 @@ XML-API functions for connecting to PANOS devices
 
 Modules:
     External: requests, xmltodict
+    Internal: xml.etree.ElementTree
 
 Classes:
 
@@ -11,7 +12,14 @@ Classes:
 
 Functions
 
-    TBA
+    get_session(host, token)
+        Get a shared XmlApi instance for a device
+    as_list(value)
+        Wrap a value in a list, unless it already is one
+    _make_err(reason, xml)
+        Build the error dict returned when a request fails
+    _session_for(host)
+        Get a persistent HTTP session for a device
 
 Exceptions:
 
@@ -19,7 +27,16 @@ Exceptions:
 
 Misc Variables:
 
-    TBA
+    _SESSIONS : dict
+        Shared XmlApi instances, keyed on (host, token)
+    _SESSIONS_LOCK : threading.Lock
+        Guards access to _SESSIONS
+    _CODE_MSG : tuple
+        API error codes 1-22 and their meanings
+    _HTTP_CODES : dict
+        HTTP-level error codes and their meanings
+    _REQUEST_TIMEOUT : tuple
+        Default connect and read timeouts, in seconds
 
 Author:
     Luke Robertson - June 2023
@@ -29,10 +46,224 @@ Enable API access on the device and get an API key
     https://docs.paloaltonetworks.com/pan-os/9-1/pan-os-panorama-api/get-started-with-the-pan-os-xml-api/get-your-api-key
 """
 
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from urllib.parse import quote
+
 import requests
 import xmltodict
 
 
+# Shared XmlApi instances, keyed on (host, token)
+#   Collectors talking to the same device reuse one connection
+#   object instead of constructing a new one per request
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+# API error codes 1-22 and their meanings, indexed by the code
+#   The codes are a dense sequence, so a tuple index replaces a
+#   dict lookup; unassigned codes hold None
+_CODE_MSG = (
+    None,
+    'Unknown command',
+    'Internal error',
+    'Internal error',
+    'Internal error',
+    'Internal error',
+    'Bad Xpath',
+    'Object not present',
+    'Object not unique',
+    None,
+    'Reference count not zero',
+    'Internal error',
+    'Invalid object',
+    'Object not found',
+    'Operation not possible',
+    'Operation denied',
+    'Unauthorized',
+    'Invalid command',
+    'Malformed command',
+    'Success',
+    'Success',
+    'Internal error',
+    'Session timed out',
+)
+
+# HTTP-level error codes, outside the dense API sequence
+_HTTP_CODES = {
+    '400': 'Bad request',
+    '403': 'Forbidden',
+}
+
+# Default connect and read timeouts, in seconds
+#   Bounds how long a request to an offline device can hang;
+#   override per instance for slow devices
+_REQUEST_TIMEOUT = (3, 10)
+
+
+@lru_cache(maxsize=64)
+def xpath_to_xml(xpath, argument):
+    """
+    Convert an xpath to an XML structure
+
+    The collectors use a small, fixed set of xpaths and arguments,
+        so the built structures are memoized
+
+    Parameters
+    ----------
+    xpath : str
+        The xpath to convert
+    argument : str
+        The argument to place inside the innermost element
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    xml : str
+        The XML structure
+    """
+
+    # Split the xpath into a list
+    x_list = xpath.split('/')[1:]
+
+    # Create the XML structure
+    #   Joining builds each half in one allocation,
+    #   rather than one string per +=
+    opens = ''.join(f'<{entry}>' for entry in x_list)
+    closes = ''.join(f'</{entry}>' for entry in reversed(x_list))
+
+    # Return the XML structure, with the argument in the middle
+    return opens + argument + closes
+
+
+@lru_cache(maxsize=32)
+def _encode_cmd(command):
+    """
+    URL-encode a command or xpath for the request URL
+
+    The collectors issue the same handful of commands over and
+        over, so the encoded forms are cached
+
+    Parameters
+    ----------
+    command : str
+        The command XML or config xpath to encode
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    str
+        The URL-encoded form
+    """
+
+    return quote(command, safe='')
+
+
+def as_list(value):
+    """
+    Wrap a value in a list, unless it already is one
+
+    xmltodict collapses single-entry nodes to a plain dict and
+        empty nodes to None, so every collector iterating entries
+        needs this normalisation; it lives here so they all share
+        one copy
+
+    Parameters
+    ----------
+    value : dict | list | None
+        The value to wrap; None becomes an empty list
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list
+        The value as a list
+    """
+
+    if isinstance(value, list):
+        return value
+
+    return [] if value is None else [value]
+
+
+def _make_err(reason, xml):
+    """
+    Build the error dict returned when a request fails
+
+    One shape for every failure path, so callers can always
+        probe for the 'error' key
+
+    Parameters
+    ----------
+    reason : str
+        A description of the failure
+    xml : str
+        The command that was being sent
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    dict
+        The error, and the command that caused it
+    """
+
+    return {
+        "error": reason,
+        "command": xml
+    }
+
+
+@lru_cache(maxsize=64)
+def _session_for(host):
+    """
+    Get a persistent HTTP session for a device
+
+    One keep-alive session per host, shared by every XmlApi
+        instance talking to it, so the TLS handshake is paid
+        once per device rather than once per request
+    The pool is sized for the concurrent fan-out the
+        collectors use
+
+    Parameters
+    ----------
+    host : str
+        The FQDN of the device to connect to
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    requests.Session
+        The shared session for this device
+    """
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16
+    )
+    session.mount('https://', adapter)
+
+    return session
+
+
 class XmlApi:
     """
     Connect to a PANOS device using XML-API
@@ -55,9 +286,17 @@ class XmlApi:
     get_config()
         Get the current configuration
         Use XPath to limit the config
+
+    op_stream(xpath)
+        Run an operational command, streaming the response
+        Yields matching elements as they are parsed
+
+    op_entries(xpath)
+        Run an operational command, yielding flat records
+        One dict of the requested fields per matching element
     """
 
-    def __init__(self, host, token):
+    def __init__(self, host, token, cache_ttl=0, timeout=_REQUEST_TIMEOUT):
         """
         Class constructor
 
@@ -72,6 +311,14 @@ class XmlApi:
             The FQDN of the device to connect to
         token : str
             The API token to use for authentication
+        cache_ttl : int, optional
+            Seconds to cache parsed responses for
+            Disabled by default (0), as cached reads can be stale;
+                opt in for idempotent polling of slow-changing data
+        timeout : tuple, optional
+            Connect and read timeouts, in seconds
+            Raise the read timeout for devices whose config is
+                large enough to take longer to generate
 
         Raises
         ------
@@ -89,6 +336,104 @@ class XmlApi:
             'X-PAN-KEY': token
         }
 
+        # Shared keep-alive session for this device
+        self.session = _session_for(host)
+
+        # Fixed URL prefixes; the per-call URL is one concatenation
+        self._config_prefix = (
+            f'{self.host}/?type=config&action=get&xpath='
+        )
+        self._op_prefix = f'{self.host}/?type=op&cmd='
+
+        # How long a request may take before it fails
+        self.timeout = timeout
+
+        # Optional parsed-response cache
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def _cache_get(self, key):
+        """
+        Look up a parsed response in the cache
+
+        Parameters
+        ----------
+        key : tuple
+            The cache key for the request
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        dict
+            The cached response, or None on a miss, expiry,
+                or if caching is disabled
+        """
+
+        if not self.cache_ttl:
+            return None
+
+        with self._cache_lock:
+            hit = self._cache.get(key)
+
+        if hit is None or time.monotonic() - hit[0] >= self.cache_ttl:
+            return None
+
+        return hit[1]
+
+    def _cache_put(self, key, response):
+        """
+        Store a parsed response in the cache
+
+        Parameters
+        ----------
+        key : tuple
+            The cache key for the request
+        response : dict
+            The parsed response to store
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        if self.cache_ttl:
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic(), response)
+
+    def invalidate(self, xpath=None):
+        """
+        Drop cached responses
+
+        Parameters
+        ----------
+        xpath : str, optional
+            Only drop entries for this xpath
+            Drops everything when omitted
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+
+        with self._cache_lock:
+            if xpath is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[1] == xpath]:
+                    del self._cache[key]
+
     def check_response(self, response):
         """
         Check a response from a device
@@ -109,33 +454,6 @@ class XmlApi:
             True if the response was successful
         """
 
-        # A dictionary of error codes and their meanings
-        err_codes = {
-            '400': 'Bad request',
-            '403': 'Forbidden',
-            '1': 'Unknown command',
-            '2': 'Internal error',
-            '3': 'Internal error',
-            '4': 'Internal error',
-            '5': 'Internal error',
-            '6': 'Bad Xpath',
-            '7': 'Object not present',
-            '8': 'Object not unique',
-            '10': 'Reference count not zero',
-            '11': 'Internal error',
-            '12': 'Invalid object',
-            '13': 'Object not found',
-            '14': 'Operation not possible',
-            '15': 'Operation denied',
-            '16': 'Unauthorized',
-            '17': 'Invalid command',
-            '18': 'Malformed command',
-            '19': 'Success',
-            '20': 'Success',
-            '21': 'Internal error',
-            '22': 'Session timed out',
-        }
-
         # A failure response will have a status of 'error'
         if response['response']['@status'] == 'error':
             # Get the error code
@@ -152,11 +470,17 @@ class XmlApi:
                 error = 'Unknown error'
 
             # Print the error messages
+            #   API codes index the tuple; anything else falls back
+            #   to the HTTP code table
             print("Error accessing the API")
-            if code not in err_codes:
+            if code.isdigit() and int(code) < len(_CODE_MSG):
+                meaning = _CODE_MSG[int(code)]
+            else:
+                meaning = _HTTP_CODES.get(code)
+            if meaning is None:
                 print(f'Unknown error code: {code}')
             else:
-                print(f'Error code: {code} ({err_codes[code]})')
+                print(f'Error code: {code} ({meaning})')
             print(f'Error: {error}')
 
             # Return False to indicate a failure
@@ -187,19 +511,33 @@ class XmlApi:
             An error message if the request failed
         """
 
+        # Return a cached response if there is a fresh one
+        cache_key = ('config', xpath)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         # Create the URL to connect to
-        url = f'{self.host}/?type=config&action=get&xpath={xpath}'
+        url = self._config_prefix + _encode_cmd(xpath)
 
         # Make the request
-        response = requests.get(
-            url,
-            headers=self.headers,
-            verify=True
-        )
+        #   The timeout bounds how long an offline device can hang us
+        try:
+            response = self.session.get(
+                url,
+                headers=self.headers,
+                verify=True,
+                timeout=self.timeout
+            )
+        except requests.exceptions.ConnectTimeout:
+            return _make_err("Timeout while connecting to device", xpath)
+        except requests.exceptions.RequestException as e:
+            return _make_err(f"Error while connecting: {e}", xpath)
 
         # Check the response was successful
-        response_dict = xmltodict.parse(response.text)
+        response_dict = xmltodict.parse(response.content)
         if self.check_response(response_dict):
+            self._cache_put(cache_key, response_dict)
             return response_dict
         else:
             return {
@@ -241,53 +579,156 @@ class XmlApi:
         else:
             arg = ''
 
+        # Return a cached response if there is a fresh one
+        cache_key = ('op', xpath, arg)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         # Convert the xpath to XML
-        xml = self.xpath_to_xml(xpath, arg)
+        xml = xpath_to_xml(xpath, arg)
 
         # Create the URL to connect to
-        url = f'{self.host}/?type=op&cmd={xml}'
+        url = self._op_prefix + _encode_cmd(xml)
 
         # Make the request
+        #   The timeout bounds how long an offline device can hang us
         try:
-            response = requests.get(
+            response = self.session.get(
                 url,
                 headers=self.headers,
-                verify=True
+                verify=True,
+                timeout=self.timeout
             )
         except requests.exceptions.ConnectTimeout:
-            return {
-                "error": "Timeout while connecting to device",
-                "command": xml
-            }
+            return _make_err("Timeout while connecting to device", xml)
         except requests.exceptions.ConnectionError:
-            return {
-                "error": "Error connecting to device",
-                "command": xml
-            }
+            return _make_err("Error connecting to device", xml)
         except Exception as e:
-            return {
-                "error": f"Error while connecting: {e}",
-                "command": xml
-            }
+            return _make_err(f"Error while connecting: {e}", xml)
 
         # Check the response was successful
-        response_dict = xmltodict.parse(response.text)
+        response_dict = xmltodict.parse(response.content)
         if self.check_response(response_dict):
+            self._cache_put(cache_key, response_dict)
             return response_dict
         else:
-            return {
-                "error": "Error retrieving config",
-                "command": xml
+            return _make_err("Error retrieving config", xml)
+
+    def op_stream(self, xpath, **kwargs):
+        """
+        Run an operational command, streaming the response
+
+        Unlike op(), this does not materialise the whole response as a
+            dictionary. Elements are parsed and yielded one at a time,
+            then released, so memory stays flat on large tables
+            (eg, a MAC or routing table with thousands of entries)
+
+        Parameters
+        ----------
+        xpath : str
+            The xpath that represents the operational command
+        **kwargs : dict
+            arg : str
+                The argument to pass to the command
+            tag : str
+                The element tag to yield (defaults to 'entry')
+
+        Raises
+        ------
+        None
+
+        Yields
+        ------
+        xml.etree.ElementTree.Element
+            Each matching element, as it is parsed
+        """
+
+        arg = kwargs.get('arg', '')
+        tag = kwargs.get('tag', 'entry')
+
+        # Convert the xpath to XML
+        xml = xpath_to_xml(xpath, arg)
+
+        # Create the URL to connect to
+        url = self._op_prefix + _encode_cmd(xml)
+
+        # Make the request, keeping the body as a stream
+        response = self.session.get(
+            url,
+            headers=self.headers,
+            verify=True,
+            stream=True,
+            timeout=self.timeout
+        )
+        response.raw.decode_content = True
+
+        # Parse incrementally, yielding and releasing each match
+        for _, element in ElementTree.iterparse(response.raw):
+            if element.tag == tag:
+                yield element
+                element.clear()
+
+    @classmethod
+    def op_many(cls, hosts_tokens, xpath, **kwargs):
+        """
+        Run one operational command against many devices
+
+        The per-device calls are network-bound, so they are
+            dispatched through a thread pool; total time approaches
+            the slowest device rather than the sum of them all
+        Each device's shared session is used, so no extra
+            handshakes are paid
+
+        Parameters
+        ----------
+        hosts_tokens : list
+            (host, token) pairs, one per device
+        xpath : str
+            The xpath that represents the operational command
+        **kwargs : dict
+            arg : str
+                The argument to pass to the command
+
+        Raises
+        ------
+        None
+
+        Yields
+        ------
+        tuple
+            (host, response) pairs, in completion order
+        """
+
+        arg = kwargs.get('arg', '')
+        workers = min(16, len(hosts_tokens)) or 1
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    get_session(host, token).op, xpath=xpath, arg=arg
+                ): host
+                for host, token in hosts_tokens
             }
 
-    def xpath_to_xml(self, xpath, argument):
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def op_list(self, xpath, **kwargs):
         """
-        Convert an xpath to an XML structure
+        Run an operational command, returning the entries as a list
+
+        A convenience wrapper around op() for callers that only want
+            the result entries; the single-vs-list-vs-missing shapes
+            xmltodict produces are all normalised to a list
 
         Parameters
         ----------
         xpath : str
-            The xpath to convert
+            The xpath that represents the operational command
+        **kwargs : dict
+            arg : str
+                The argument to pass to the command
 
         Raises
         ------
@@ -295,27 +736,92 @@ class XmlApi:
 
         Returns
         -------
-        xml : str
-            The XML structure
+        list
+            The result entries; empty if there were none,
+                or if the request failed
         """
 
-        # Split the xpath into a list
-        x_list = xpath.split('/')
-        x_list.pop(0)
+        response = self.op(xpath, **kwargs)
 
-        # Create the XML structure
-        xml = ''
-        for entry in x_list:
-            xml += f'<{entry}>'
+        result = response.get('response', {}).get('result')
+        if result is None:
+            return []
 
-        # Add the argument
-        xml += argument
+        return as_list(result.get('entry'))
+
+    def op_entries(self, xpath, **kwargs):
+        """
+        Run an operational command, yielding flat records
+
+        Builds on op_stream(): each matching element is reduced to a
+            dict of the requested fields and released immediately,
+            so a large table (eg, MAC or routing) streams through
+            in constant memory without the nested-dict wrapping
+
+        Parameters
+        ----------
+        xpath : str
+            The xpath that represents the operational command
+        **kwargs : dict
+            arg : str
+                The argument to pass to the command
+            tag : str
+                The element tag to extract (defaults to 'entry')
+            fields : tuple
+                The child elements to pull from each match
+
+        Raises
+        ------
+        None
+
+        Yields
+        ------
+        dict
+            One record per matching element, keyed on the
+                requested fields
+        """
+
+        fields = kwargs.pop('fields', ())
+
+        for element in self.op_stream(xpath, **kwargs):
+            yield {
+                field: element.findtext(field) or ''
+                for field in fields
+            }
+
+
+def get_session(host, token):
+    """
+    Get a shared XmlApi instance for a device
+
+    Repeated callers for the same host and token get the same
+        object back, so connection state can be reused rather
+        than rebuilt per request
+
+    Parameters
+    ----------
+    host : str
+        The FQDN of the device to connect to
+    token : str
+        The API token to use for authentication
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    XmlApi
+        The shared API instance for this device
+    """
 
-        for entry in reversed(x_list):
-            xml += f'</{entry}>'
+    key = (host, token)
+    with _SESSIONS_LOCK:
+        api = _SESSIONS.get(key)
+        if api is None:
+            api = _SESSIONS[key] = XmlApi(host, token)
 
-        # Return the XML structure
-        return xml
+    return api
 
 
 # Handle running as a script